@@ -7,7 +7,9 @@ Lê dados de um A&D (aba/planilha fonte) e preenche uma planilha no formato Fast
 FastBound. Gera também um relatório de mapeamento.
 
 Compatível com macOS, Linux e Windows.
-Requer: pandas, openpyxl, xlsxwriter, pyyaml (opcional para YAML)
+Requer: pandas, openpyxl, pyyaml (opcional para YAML),
+       rapidfuzz (opcional, acelera o fuzzy match),
+       python-calamine (opcional, leitura de .xlsx em Rust: pip install python-calamine)
 
 Uso básico:
   python fastbound_importer.py \
@@ -15,6 +17,11 @@ Uso básico:
     --fastbound "/caminho/FastBoundImport Live - By Chris.xlsx" --fastbound-sheet "FastBoundImport Live - By Chris" \
     --out "/caminho/FastBoundImport_Populado.xlsx"
 
+Saída em CSV/Parquet (muito mais rápido em planilhas grandes; relatórios vão
+para <out>_report.xlsx):
+  python fastbound_importer.py ... --out FastBoundImport.csv
+  python fastbound_importer.py ... --out FastBoundImport.parquet   # requer pyarrow
+
 Com mapeamento manual (CSV/YAML/JSON):
   python fastbound_importer.py ... --map overrides.csv
 
@@ -28,21 +35,51 @@ Autor: você 😄
 """
 
 import argparse
+import csv
+import functools
+import importlib.util
+import json
 import logging
+import math
+import re
+import sys
+from collections.abc import Hashable
 from difflib import get_close_matches
-
-import pandas as pd
-import numpy as np
+from operator import itemgetter
 from pathlib import Path
 
+# pandas/numpy/openpyxl são importados dentro das funções que os usam:
+# --help e erros de argumento não pagam o custo de carregar o pandas
+
 try:
     import yaml  # opcional
     HAS_YAML = True
 except Exception:
     HAS_YAML = False
 
+try:
+    from rapidfuzz import process, fuzz  # opcional (fuzzy em C++)
+    HAS_RAPIDFUZZ = True
+except Exception:
+    HAS_RAPIDFUZZ = False
+
+# opcional (engine "calamine" do pandas); find_spec só verifica, não importa
+HAS_CALAMINE = importlib.util.find_spec("python_calamine") is not None
+
+# None = engine padrão do pandas (openpyxl)
+EXCEL_ENGINE = "calamine" if HAS_CALAMINE else None
+
+# remove tudo que não é alfanumérico ASCII numa única passada em C
+_DEL_TABLE = str.maketrans('', '', ''.join(chr(c) for c in range(128) if not chr(c).isalnum()))
+
+# typed=True: 3 e 3.0 normalizam diferente ("3" vs "30")
+@functools.lru_cache(maxsize=4096, typed=True)
 def norm(s: str) -> str:
-    return ''.join(ch for ch in str(s).lower() if ch.isalnum())
+    s = str(s).lower().translate(_DEL_TABLE)
+    if s.isascii():
+        return s
+    # fallback para cabeçalhos com acentos/unicode
+    return ''.join(ch for ch in s if ch.isalnum())
 
 ALIASES = {
     # identidade
@@ -91,6 +128,39 @@ ALIASES = {
     "price": ["price","saleprice","sellingprice","amount"],
 }
 
+# Índices pré-normalizados (montados uma vez no import):
+# ALIAS_GROUPS: canônico -> aliases normalizados (ordem de busca preservada)
+# ALIAS_INDEX: alias normalizado -> canônicos que o contêm (ex.: "zip", "ffl", "ntn" são ambíguos)
+ALIAS_GROUPS = {canon: [norm(a) for a in aliases+[canon]] for canon, aliases in ALIASES.items()}
+ALIAS_INDEX = {}
+for _canon, _group in ALIAS_GROUPS.items():
+    for _k in dict.fromkeys(_group):
+        ALIAS_INDEX.setdefault(_k, []).append(_canon)
+
+# Dicas para colunas sem origem: (grupo, palavras-chave, texto)
+HINT_PATTERNS = [
+    ("serial", ["serial", "sn"], "Número de série – marcação na arma / 4473 / registro anterior."),
+    ("mfr", ["manufacturer","mfr","maker","make"], "Fabricante – marcação do frame/receiver; nota do fornecedor."),
+    ("importer", ["importer"], "Importador – marcação no cano/frame; invoice de entrada."),
+    ("model", ["model"], "Modelo – marcação na arma; invoice/packing slip."),
+    ("caliber", ["caliber","gauge"], "Calibre/ga – gravado no cano/slide; ficha do fabricante."),
+    ("type", ["type"], "Tipo – pistol/revolver/rifle/shotgun/receiver/other."),
+    ("length", ["barrel","length","oal"], "Comprimento de cano/OAL – ficha técnica; inspeção."),
+    ("finish", ["finish","color"], "Acabamento/cor – inspeção / descrição do fabricante."),
+    ("upc", ["upc","sku"], "UPC/SKU – caixa do produto; invoice."),
+    ("acq", ["acq","acquisition","received","source","supplier","vendor"], "Dados de aquisição – fornecedor, data, invoice/PO."),
+    ("dispo", ["dispo","dispose","transferee","customer","buyer","4473"], "Dados de disposição – cliente/FFL, data, 4473, NICS."),
+    ("nics", ["nics","ttn","poc","background"], "Background – NICS/POC (número/status/expiração)."),
+    ("ffl", ["ffl","license"], "FFL – nº/expiração do destinatário; cópia arquivada."),
+    ("value", ["cost","price","amount","msrp"], "Valores – custo/preço; ERP/nota fiscal."),
+]
+# Uma única regex com um grupo nomeado por dica. Cada alternativa fica dentro
+# de um lookahead para que palavras sobrepostas (ex.: "nics" e "sn" em
+# "nicsnumber") sejam todas encontradas, como no teste por substring.
+HINT_RE = re.compile("|".join(
+    f"(?=(?P<{name}>{'|'.join(map(re.escape, words))}))" for name, words, _ in HINT_PATTERNS
+))
+
 def read_overrides(path: Path):
     """
     Lê overrides de mapeamento:
@@ -105,29 +175,214 @@ def read_overrides(path: Path):
     if not p.exists():
         raise FileNotFoundError(f"Arquivo de mapeamento não encontrado: {p}")
     if p.suffix.lower() == ".csv":
-        df = pd.read_csv(p)
-        if not set(df.columns).issuperset({"FastBound Column","ATF Source"}):
-            raise ValueError("CSV de override deve ter colunas 'FastBound Column' e 'ATF Source'.")
-        return {str(r["FastBound Column"]).strip(): str(r["ATF Source"]).strip() for _, r in df.iterrows()}
+        # utf-8-sig: aceita CSV salvo pelo Excel (com BOM)
+        with p.open(newline="", encoding="utf-8-sig") as f:
+            r = csv.DictReader(f)
+            if not {"FastBound Column","ATF Source"}.issubset(r.fieldnames or ()):
+                raise ValueError("CSV de override deve ter colunas 'FastBound Column' e 'ATF Source'.")
+            return {(row["FastBound Column"] or "").strip(): (row["ATF Source"] or "").strip() for row in r}
     elif p.suffix.lower() in (".json",):
-        return json.loads(p.read_text(encoding="utf-8"))
+        data = json.loads(p.read_text(encoding="utf-8"))
     elif p.suffix.lower() in (".yml",".yaml"):
         if not HAS_YAML:
             raise RuntimeError("pyyaml não instalado. Rode: pip install pyyaml")
-        return yaml.safe_load(p.read_text(encoding="utf-8"))
+        data = yaml.safe_load(p.read_text(encoding="utf-8")) or {}
     else:
         raise ValueError("Formato de override não suportado. Use CSV, JSON ou YAML.")
+    # valores viram chave do cache de norm(): listas/mapas não são aceitos.
+    # Escalares (ex.: 4473 no YAML) valem como nome de coluna; null = sem origem.
+    if not isinstance(data, dict) or not all(isinstance(v, Hashable) for v in data.values()):
+        raise ValueError("Override JSON/YAML deve ser um mapa { \"FastBound Column\": \"ATF Source\" } com um valor simples por coluna.")
+    return data
+
+def read_header(path: Path, sheet_name=None):
+    """
+    Lê só a linha de cabeçalho de uma planilha.
+    - .xlsx/.xlsm: openpyxl em modo read_only (não carrega as demais linhas)
+    - outros formatos (.xls etc.): pandas com nrows=0
+    Retorna (nome_da_aba, lista_de_colunas)
+    """
+    if Path(path).suffix.lower() not in (".xlsx", ".xlsm", ".xltx", ".xltm"):
+        import pandas as pd
+        with pd.ExcelFile(path, engine=EXCEL_ENGINE) as xls:
+            sheet_name = sheet_name or xls.sheet_names[0]
+            return sheet_name, list(pd.read_excel(xls, sheet_name=sheet_name, nrows=0).columns)
+    from openpyxl import load_workbook
+    wb = load_workbook(path, read_only=True, data_only=True)
+    try:
+        ws = wb[sheet_name] if sheet_name else wb.worksheets[0]
+        header = list(next(ws.iter_rows(max_row=1, values_only=True), ()))
+    finally:
+        wb.close()
+    # mesmo formato do pandas: descarta vazias no fim, nomeia vazias no meio,
+    # e sufixa duplicadas (".1", ".2", ...)
+    while header and header[-1] is None:
+        header.pop()
+    names = [f"Unnamed: {i}" if v is None else v for i, v in enumerate(header)]
+    original = set(names)
+    columns, seen, counts = [], set(), {}
+    for name in names:
+        if name in seen:
+            # sobe o sufixo até não colidir com gerados nem com nomes originais
+            # (ex.: Model, Model.1, Model -> Model.2)
+            base, k = name, counts.get(name, 0)
+            while name in seen or name in original:
+                k += 1
+                name = f"{base}.{k}"
+            counts[base] = k
+        seen.add(name)
+        columns.append(name)
+    return ws.title, columns
+
+# extensões de --out que escolhem o formato sem --out-format
+OUT_FORMATS = {".csv": "csv", ".parquet": "parquet"}
+# acima disso, sugere CSV (xlsx é dezenas de vezes mais lento para gravar)
+LARGE_ROWS = 50_000
+
+def build_output(atf_df, fb_columns, mapping):
+    """
+    Monta o DataFrame no layout FastBound a partir do ATF.
+    Colunas sem origem ficam NaN.
+    """
+    import numpy as np
+    import pandas as pd
+    n_rows = len(atf_df)
+    sources = [mapping.get(c) if mapping.get(c) in atf_df.columns else None for c in fb_columns]
+    # monta todas as colunas primeiro e cria o DataFrame de uma vez
+    # (atribuir coluna a coluna realoca os blocos internos a cada passo)
+    data = {}
+    for fb_col, src in zip(fb_columns, sources):
+        if src:
+            data[fb_col] = atf_df[src].to_numpy()
+        else:
+            data[fb_col] = np.full(n_rows, np.nan)
+    return pd.DataFrame(data, columns=fb_columns, copy=False)
+
+def compact_categories(df, max_ratio=0.5):
+    """
+    Converte colunas de texto muito repetitivas (fabricante, tipo, calibre,
+    estado...) para category: cada valor distinto é guardado uma vez só e o
+    Parquet grava a coluna com dicionário.
+    """
+    for c in df.select_dtypes(include=["object","string"]).columns:
+        s = df[c]
+        if s.nunique(dropna=True) < len(s) * max_ratio:
+            df[c] = s.astype("category")
+    return df
+
+REPORT_HEADER = ["FastBound Column","ATF Source","Match Type"]
+GUIDANCE_HEADER = ["Missing FastBound Column","Como obter"]
+
+def build_reports(fb_columns, mapping, details):
+    """
+    Monta as linhas das abas Mapping Report e Missing & Guidance.
+    Retorna (report_rows, guidance_rows), listas de tuplas.
+    """
+    report_rows = [tuple(d) for d in details]
+    guidance_rows = []
+    for col in fb_columns:
+        if mapping.get(col):
+            continue
+        key = str(col).lower()
+        groups = {m.lastgroup for m in HINT_RE.finditer(key)}
+        hints = [txt for name, _, txt in HINT_PATTERNS if name in groups]
+        if not hints:
+            hints.append("Verificar notas de entrada, 4473, cópia de FFL e marcações físicas.")
+        guidance_rows.append((col, " | ".join(hints)))
+    return report_rows, guidance_rows
+
+# caracteres de controle que o XML do .xlsx não aceita (mesmo conjunto do
+# openpyxl.cell.cell.ILLEGAL_CHARACTERS_RE; \t, \n e \r são válidos)
+ILLEGAL_XML_RE = re.compile(r"[\x00-\x08\x0b\x0c\x0e-\x1f]")
+
+def xl_escape(v):
+    """Escapa controles em texto como _xHHHH_ (igual ao xlsxwriter); outros valores passam."""
+    if isinstance(v, str) and ILLEGAL_XML_RE.search(v):
+        return ILLEGAL_XML_RE.sub(lambda m: f"_x{ord(m.group()):04X}_", v)
+    return v
+
+def write_rows(wb, title, header, rows):
+    """Escreve cabeçalho + linhas numa aba nova de um Workbook write_only."""
+    ws = wb.create_sheet(title)
+    ws.append([xl_escape(v) for v in header])
+    for row in rows:
+        ws.append([xl_escape(v) for v in row])
+
+def parquet_safe(df):
+    """
+    Parquet exige um tipo por coluna; o Excel costuma misturar números e texto
+    (ex.: série 0, "SN1"). Colunas texto/categoria mistas viram string
+    (NaN continua nulo).
+    """
+    import pandas as pd
+    for c in df.select_dtypes(include=["object","string","category"]).columns:
+        s = df[c]
+        is_cat = isinstance(s.dtype, pd.CategoricalDtype)
+        values = s.cat.categories if is_cat else s
+        if pd.api.types.infer_dtype(values, skipna=True) not in ("mixed", "mixed-integer"):
+            continue
+        obj = s.astype(object)
+        s = obj.where(obj.isna(), obj.map(str))
+        df[c] = s.astype("category") if is_cat else s
+    return df
+
+def write_mapped_sheet(wb, title, atf_df, fb_columns, mapping):
+    """
+    Escreve a aba FastBound direto das linhas do ATF. O mapeamento é fixo,
+    então vira um único itemgetter (posições inteiras, tupla montada em C)
+    em vez de um lookup por célula.
+    """
+    import numpy as np
+    ws = wb.create_sheet(title)
+    ws.append([xl_escape(c) for c in fb_columns])
+    if not fb_columns:
+        return
+    sources = [mapping.get(c) if mapping.get(c) in atf_df.columns else None for c in fb_columns]
+    used = list(dict.fromkeys(s for s in sources if s))
+    sub = atf_df[used]
+    text_cols = sub.select_dtypes(include=["object","string"]).columns
+    if len(text_cols):
+        sub = sub.copy()
+        for c in text_cols:
+            sub[c] = sub[c].map(xl_escape)
+    # última coluna fica vazia (None) e serve às colunas FastBound sem origem
+    values = np.empty((len(atf_df), len(used) + 1), dtype=object)
+    values[:, :-1] = sub.astype(object).where(sub.notna(), None).to_numpy()
+    pos = {s: i for i, s in enumerate(used)}
+    idx = [pos[s] if s else len(used) for s in sources]
+    emit = itemgetter(*idx) if len(idx) > 1 else (lambda row, i=idx[0]: (row[i],))
+    for row in values.tolist():
+        ws.append(emit(row))
+
+def one_insert(short: str, long: str) -> bool:
+    """True se `long` é `short` com exatamente um caractere inserido (len(long) == len(short)+1)."""
+    i = 0
+    while i < len(short) and short[i] == long[i]:
+        i += 1
+    return short[i:] == long[i+1:]
 
 def build_mapping(atf_cols, fb_cols, overrides=None, fuzzy_cutoff=0.84, logger=None):
+    if not 0.0 <= fuzzy_cutoff <= 1.0:
+        raise ValueError(f"fuzzy_cutoff deve estar entre 0 e 1 (recebido {fuzzy_cutoff}).")
     atf_norm_map = {norm(c): c for c in atf_cols}
+    # chaves calculadas uma vez e reutilizadas por todas as colunas FastBound;
+    # agrupadas por comprimento (ordem original mantida) para o teste d=1
+    atf_keys = list(atf_norm_map)
+    atf_by_len = {}
+    for k in atf_keys:
+        atf_by_len.setdefault(len(k), []).append(k)
     mapping = {}
     details = []
 
     # Aplicar overrides primeiro
     overrides = overrides or {}
     for fb_col, atf_src in overrides.items():
+        # null/None força a coluna a ficar sem origem
+        if atf_src is None:
+            mapping[fb_col] = None
+            details.append((fb_col, "", "OVERRIDE-NOTFOUND"))
         # permitir apontar por nome "natural" da coluna ATF
-        if atf_src in atf_cols:
+        elif atf_src in atf_cols:
             mapping[fb_col] = atf_src
             details.append((fb_col, atf_src, "OVERRIDE"))
         else:
@@ -150,26 +405,48 @@ def build_mapping(atf_cols, fb_cols, overrides=None, fuzzy_cutoff=0.84, logger=N
             mapping[fb_col] = atf_norm_map[fb_key]
             details.append((fb_col, atf_norm_map[fb_key], "DIRECT"))
             continue
-        # alias
+        # alias (lookup O(1) no índice invertido)
         hit = None
-        for target, alias_list in ALIASES.items():
-            if fb_key == target or fb_key in map(norm, alias_list+[target]):
-                for a in alias_list+[target]:
-                    k = norm(a)
-                    if k in atf_norm_map:
-                        hit = atf_norm_map[k]
-                        break
+        for canon in ALIAS_INDEX.get(fb_key, ()):
+            for k in ALIAS_GROUPS[canon]:
+                if k in atf_norm_map:
+                    hit = atf_norm_map[k]
+                    break
             if hit:
                 break
         if hit:
             mapping[fb_col] = hit
             details.append((fb_col, hit, "ALIAS"))
             continue
-        # fuzzy
-        cand = get_close_matches(fb_key, list(atf_norm_map.keys()), n=1, cutoff=fuzzy_cutoff)
-        if cand:
-            mapping[fb_col] = atf_norm_map[cand[0]]
-            details.append((fb_col, atf_norm_map[cand[0]], "FUZZY"))
+        n = len(fb_key)
+        # d=1 (um caractere a mais/a menos): com n >= 3 nenhum outro candidato
+        # tem ratio (Indel, rapidfuzz) maior (e n+1 vence n-1), então não precisa
+        # do fuzzy. O ratio do difflib não é baseado em LCS: lá não vale o atalho.
+        cand = None
+        if n >= 3 and HAS_RAPIDFUZZ:
+            cand = next((k for k in atf_by_len.get(n + 1, ()) if one_insert(fb_key, k)), None) \
+                or next((k for k in atf_by_len.get(n - 1, ()) if one_insert(k, fb_key)), None)
+            if cand is not None and 1 - 1 / (n + len(cand)) < fuzzy_cutoff:
+                cand = None
+        # fuzzy (rapidfuzz se disponível; difflib como fallback)
+        # ratio = 1 - dist/(la+lb) e dist >= |la-lb|: fora desta janela de
+        # comprimento nenhum candidato atinge o corte, então nem comparamos
+        if cand is None:
+            keys = atf_keys
+            if fuzzy_cutoff > 0:
+                lo = math.floor(n * fuzzy_cutoff / (2 - fuzzy_cutoff))
+                hi = math.ceil(n * (2 - fuzzy_cutoff) / fuzzy_cutoff)
+                keys = [k for k in atf_keys if lo <= len(k) <= hi]
+            if keys and HAS_RAPIDFUZZ:
+                # score_cutoff é propagado ao Levenshtein (aborta ao estourar o limite)
+                match = process.extractOne(fb_key, keys, scorer=fuzz.ratio, score_cutoff=fuzzy_cutoff*100)
+                cand = match[0] if match is not None else None
+            elif keys:
+                close = get_close_matches(fb_key, keys, n=1, cutoff=fuzzy_cutoff)
+                cand = close[0] if close else None
+        if cand is not None:
+            mapping[fb_col] = atf_norm_map[cand]
+            details.append((fb_col, atf_norm_map[cand], "FUZZY"))
         else:
             mapping[fb_col] = None
             details.append((fb_col, "", "MISSING"))
@@ -180,6 +457,16 @@ def build_mapping(atf_cols, fb_cols, overrides=None, fuzzy_cutoff=0.84, logger=N
         logger.info(f"Mapeados: {ok}/{total} colunas FastBound")
     return mapping, details
 
+def cutoff_arg(value):
+    """Tipo do argparse para --fuzzy-cutoff: float entre 0 e 1."""
+    try:
+        v = float(value)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"valor inválido: {value!r}")
+    if not 0.0 <= v <= 1.0:
+        raise argparse.ArgumentTypeError(f"deve estar entre 0 e 1 (recebido {value})")
+    return v
+
 def main():
     ap = argparse.ArgumentParser(description="Preencher planilha FastBound a partir de A&D (ATF).")
     ap.add_argument("--atf", required=True, help="Caminho do Excel ATF (entrada).")
@@ -187,12 +474,18 @@ def main():
     ap.add_argument("--fastbound", required=True, help="Caminho do Excel FastBound (template).")
     ap.add_argument("--fastbound-sheet", default=None, help="Nome da aba no FastBound (padrão: primeira).")
     ap.add_argument("--out", required=True, help="Caminho do Excel de saída preenchido.")
+    ap.add_argument("--out-format", choices=["xlsx","csv","parquet"], default=None,
+                    help="Formato da aba FastBoundImport (padrão: pela extensão de --out). "
+                         "csv/parquet gravam os relatórios em <out>_report.xlsx.")
     ap.add_argument("--map", dest="overrides", default=None, help="CSV/JSON/YAML com overrides de mapeamento.")
     ap.add_argument("--strict", action="store_true", help="Falhar (exit 2) se houver colunas FastBound sem origem.")
-    ap.add_argument("--fuzzy-cutoff", type=float, default=0.84, help="Corte de similaridade para fuzzy (0-1).")
+    ap.add_argument("--fuzzy-cutoff", type=cutoff_arg, default=0.84, help="Corte de similaridade para fuzzy (0-1).")
     ap.add_argument("--verbose", action="store_true", help="Log detalhado.")
     args = ap.parse_args()
 
+    import pandas as pd
+    from openpyxl import Workbook
+
     logging.basicConfig(level=logging.DEBUG if args.verbose else logging.INFO, format="%(levelname)s: %(message)s")
     log = logging.getLogger("fastbound")
 
@@ -208,23 +501,17 @@ def main():
         sys.exit(1)
 
     # Ler planilhas
+    log.debug(f"Engine de leitura Excel: {EXCEL_ENGINE or 'padrão'}")
     if args.atf_sheet:
-        atf_df = pd.read_excel(atf_path, sheet_name=args.atf_sheet)
+        atf_df = pd.read_excel(atf_path, sheet_name=args.atf_sheet, engine=EXCEL_ENGINE)
     else:
-        atf_df = pd.read_excel(atf_path)  # primeira aba
+        atf_df = pd.read_excel(atf_path, engine=EXCEL_ENGINE)  # primeira aba
         log.info(f"ATF sheet não especificada; usando primeira aba: {atf_df.shape}")
 
-    if args.fastbound_sheet:
-        fastbound_df = pd.read_excel(fb_path, sheet_name=args.fastbound_sheet, nrows=0)
-        fb_sheetname = args.fastbound_sheet
-    else:
-        # usar primeira aba como layout
-        with pd.ExcelFile(fb_path) as xls:
-            fb_sheetname = xls.sheet_names[0]
-        fastbound_df = pd.read_excel(fb_path, sheet_name=fb_sheetname, nrows=0)
+    fb_sheetname, fb_columns = read_header(fb_path, args.fastbound_sheet)
+    if not args.fastbound_sheet:
         log.info(f"FastBound sheet não especificada; usando '{fb_sheetname}'")
 
-    fb_columns = list(fastbound_df.columns)
     atf_columns = list(atf_df.columns)
 
     # Overrides
@@ -232,59 +519,41 @@ def main():
 
     mapping, details = build_mapping(atf_columns, fb_columns, overrides=overrides, fuzzy_cutoff=args.fuzzy_cutoff, logger=log)
 
-    # Construir saída
-    out_df = pd.DataFrame(columns=fb_columns)
-    for fb_col, src in mapping.items():
-        if src and src in atf_df.columns:
-            out_df[fb_col] = atf_df[src]
+    # Relatórios: Mapping Report e Missing & Guidance (linhas puras, sem pandas)
+    report_rows, guidance_rows = build_reports(fb_columns, mapping, details)
+
+    # Formato: --out-format ou extensão de --out (.csv/.parquet; senão xlsx)
+    out_format = args.out_format or OUT_FORMATS.get(out_path.suffix.lower(), "xlsx")
+    if out_format == "xlsx":
+        if len(atf_df) > LARGE_ROWS:
+            log.info(f"{len(atf_df)} linhas: --out-format csv grava bem mais rápido que xlsx.")
+        # Salvar com sheets: FastBoundImport, Mapping Report, Missing & Guidance
+        # (openpyxl write_only: linhas vão direto para o XML, sem objetos Cell por célula;
+        # FastBoundImport sai direto do ATF, sem montar o DataFrame intermediário)
+        wb = Workbook(write_only=True)
+        write_mapped_sheet(wb, "FastBoundImport", atf_df, fb_columns, mapping)
+        write_rows(wb, "Mapping Report", REPORT_HEADER, report_rows)
+        write_rows(wb, "Missing & Guidance", GUIDANCE_HEADER, guidance_rows)
+        wb.save(out_path)
+    else:
+        # FastBoundImport em CSV/Parquet; relatórios (pequenos) num .xlsx ao lado
+        out_path = out_path.with_suffix(f".{out_format}")
+        out_df = build_output(atf_df, fb_columns, mapping)
+        if out_format == "csv":
+            out_df.to_csv(out_path, index=False)
         else:
-            out_df[fb_col] = np.nan
-
-    # Salvar com sheets: FastBoundImport, Mapping Report, Missing & Guidance
-    with pd.ExcelWriter(out_path, engine="xlsxwriter") as writer:
-        out_df.to_excel(writer, sheet_name="FastBoundImport", index=False)
-        rep_df = pd.DataFrame(details, columns=["FastBound Column","ATF Source","Match Type"])
-        rep_df.to_excel(writer, sheet_name="Mapping Report", index=False)
-
-        # Missing guidance
-        missing = [c for c in fb_columns if not mapping.get(c)]
-        guidance_rows = []
-        for col in missing:
-            key = col.lower()
-            hints = []
-            if any(k in key for k in ["serial", "sn"]):
-                hints.append("Número de série – marcação na arma / 4473 / registro anterior.")
-            if any(k in key for k in ["manufacturer","mfr","maker","make"]):
-                hints.append("Fabricante – marcação do frame/receiver; nota do fornecedor.")
-            if any(k in key for k in ["importer"]):
-                hints.append("Importador – marcação no cano/frame; invoice de entrada.")
-            if any(k in key for k in ["model"]):
-                hints.append("Modelo – marcação na arma; invoice/packing slip.")
-            if any(k in key for k in ["caliber","gauge"]):
-                hints.append("Calibre/ga – gravado no cano/slide; ficha do fabricante.")
-            if any(k in key for k in ["type"]):
-                hints.append("Tipo – pistol/revolver/rifle/shotgun/receiver/other.")
-            if any(k in key for k in ["barrel","length","oal"]):
-                hints.append("Comprimento de cano/OAL – ficha técnica; inspeção.")
-            if any(k in key for k in ["finish","color"]):
-                hints.append("Acabamento/cor – inspeção / descrição do fabricante.")
-            if any(k in key for k in ["upc","sku"]):
-                hints.append("UPC/SKU – caixa do produto; invoice.")
-            if any(k in key for k in ["acq","acquisition","received","source","supplier","vendor"]):
-                hints.append("Dados de aquisição – fornecedor, data, invoice/PO.")
-            if any(k in key for k in ["dispo","dispose","transferee","customer","buyer","4473"]):
-                hints.append("Dados de disposição – cliente/FFL, data, 4473, NICS.")
-            if any(k in key for k in ["nics","ttn","poc","background"]):
-                hints.append("Background – NICS/POC (número/status/expiração).")
-            if any(k in key for k in ["ffl","license"]):
-                hints.append("FFL – nº/expiração do destinatário; cópia arquivada.")
-            if any(k in key for k in ["cost","price","amount","msrp"]):
-                hints.append("Valores – custo/preço; ERP/nota fiscal.")
-            if not hints:
-                hints.append("Verificar notas de entrada, 4473, cópia de FFL e marcações físicas.")
-            guidance_rows.append({"Missing FastBound Column": col, "Como obter": " | ".join(hints)})
-        gd = pd.DataFrame(guidance_rows) if guidance_rows else pd.DataFrame(columns=["Missing FastBound Column","Como obter"])
-        gd.to_excel(writer, sheet_name="Missing & Guidance", index=False)
+            try:
+                # category só compensa no Parquet (vira coluna com dicionário)
+                parquet_safe(compact_categories(out_df)).to_parquet(out_path, index=False)
+            except (ImportError, ValueError) as e:  # pyarrow ausente / ArrowInvalid
+                log.error(f"Falha ao gravar Parquet ({e}). Instale pyarrow ou use --out-format csv.")
+                sys.exit(1)
+        report_path = out_path.with_name(f"{out_path.stem}_report.xlsx")
+        wb = Workbook(write_only=True)
+        write_rows(wb, "Mapping Report", REPORT_HEADER, report_rows)
+        write_rows(wb, "Missing & Guidance", GUIDANCE_HEADER, guidance_rows)
+        wb.save(report_path)
+        log.info(f"Relatórios: {report_path}")
 
     # Saída de status para automações/CI
     missing_count = sum(1 for c in fb_columns if not mapping.get(c))
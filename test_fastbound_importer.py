@@ -0,0 +1,44 @@
+import pandas as pd
+import pytest
+from openpyxl import Workbook, load_workbook
+
+import fastbound_importer as fbi
+
+
+def test_control_characters_are_escaped_in_xlsx_output(tmp_path):
+    atf_df = pd.DataFrame({"Serial": ["A\x0bB", "SN2"], "Maker": ["Glock\tInc", None], "Qty": [1, 2]})
+    fb_columns = ["Serial Number", "Manufacturer", "Notes\x01"]
+    mapping = {"Serial Number": "Serial", "Manufacturer": "Maker", "Notes\x01": None}
+    out = tmp_path / "out.xlsx"
+
+    wb = Workbook(write_only=True)
+    fbi.write_mapped_sheet(wb, "FastBoundImport", atf_df, fb_columns, mapping)
+    fbi.write_rows(wb, "Mapping Report", fbi.REPORT_HEADER, [("Notes\x01", "", "MISSING")])
+    wb.save(out)
+
+    rows = list(load_workbook(out)["FastBoundImport"].iter_rows(values_only=True))
+    assert rows == [
+        ("Serial Number", "Manufacturer", "Notes_x0001_"),
+        ("A_x000B_B", "Glock\tInc", None),
+        ("SN2", None, None),
+    ]
+    report = list(load_workbook(out)["Mapping Report"].iter_rows(values_only=True))
+    assert report[1][0] == "Notes_x0001_"
+
+
+def test_override_scalars_and_null(tmp_path):
+    p = tmp_path / "overrides.json"
+    p.write_text('{"Form 4473": 4473, "Type": null}', encoding="utf-8")
+    overrides = fbi.read_overrides(p)
+    _, details = fbi.build_mapping([4473, "Type"], ["Form 4473", "Type"], overrides=overrides)
+    assert details[:2] == [("Form 4473", 4473, "OVERRIDE"), ("Type", "", "OVERRIDE-NOTFOUND")]
+
+    p.write_text('{"Type": ["Maker"]}', encoding="utf-8")
+    with pytest.raises(ValueError):
+        fbi.read_overrides(p)
+
+
+@pytest.mark.parametrize("cutoff", [-0.1, 1.5, 2])
+def test_fuzzy_cutoff_out_of_range(cutoff):
+    with pytest.raises(ValueError):
+        fbi.build_mapping(["Serial"], ["Serial Number"], fuzzy_cutoff=cutoff)